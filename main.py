@@ -17,15 +17,27 @@ Date: 2025
 import os
 import json
 import fitz  # PyMuPDF library for PDF processing
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import re
 
 # Common words and phrases that should be filtered out as noise
-NOISE_WORDS = {
+NOISE_WORDS = (
     "open access", "research", "sustainable environment", "article", "journal",
     "abstract", "introduction", "references", "acknowledgments", "appendix",
     "received", "accepted", "published", "volume", "issue", "pp.", "pages"
-}
+)
+
+# Single alternation over all noise words so is_noisy needs only one search
+_NOISE_RE = re.compile("|".join(map(re.escape, NOISE_WORDS)))
+
+# Precompiled pattern used by clean_text, which runs on every text span
+_HYPH_RE = re.compile(r'(\w)-\s+(\w)')
+
+# Default "dict" extraction flags without image blocks, which are never used here.
+# Without them MuPDF also stops splitting text lines at inline images, so text on
+# either side of an image is extracted as one line
+_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
 
 def clean_text(text):
     """
@@ -35,7 +47,9 @@ def clean_text(text):
     1. Normalizes all whitespace by converting newlines to spaces
     2. Collapses multiple consecutive spaces into single spaces
     3. Repairs hyphenated word breaks (e.g., "under- standing" -> "understanding")
-    4. Fixes cases where words are broken across lines without hyphens
+    
+    Words split across lines without a hyphen are left as-is; joining them
+    by length alone would also fuse ordinary neighbouring words.
     
     Args:
         text (str): Raw text extracted from PDF that may contain formatting artifacts
@@ -49,18 +63,17 @@ def clean_text(text):
         >>> clean_text("word   with\n  extra   spaces")
         "word with extra spaces"
     """
-    # Normalize all whitespace by replacing newlines with spaces and collapsing multiple spaces
-    text = " ".join(text.replace("\n", " ").split())
+    # Normalize all whitespace (newlines, tabs, repeated spaces) to single spaces;
+    # str.split() handles every whitespace kind in one C-level pass, which is
+    # faster than a regex substitution or a translate() table on span text
+    text = " ".join(text.split())
     
     # Fix hyphenated word breaks (e.g., "under- standing" -> "understanding")
-    text = re.sub(r'(\w)-\s+(\w)', r'\1\2', text)
-    
-    # Fix cases where words are broken across lines without hyphens
-    # This is a heuristic approach that joins words if both parts are longer than 2 characters
-    text = re.sub(r'(\w)\s+(\w)', lambda m: m.group(1) + m.group(2) if len(m.group(1)) > 2 and len(m.group(2)) > 2 else m.group(0), text)
+    text = _HYPH_RE.sub(r'\1\2', text)
     
     return text.strip()
 
+@lru_cache(maxsize=4096)
 def is_noisy(text):
     """
     Determine if text should be filtered out as noise or irrelevant content.
@@ -71,6 +84,9 @@ def is_noisy(text):
     - Publication metadata (volume, issue, page numbers)
     - Very short text fragments (likely page numbers or artifacts)
     
+    Results are memoized, since the same span text is checked several times
+    while extracting the title and the outline.
+    
     Args:
         text (str): Text content to evaluate
         
@@ -85,19 +101,66 @@ def is_noisy(text):
         >>> is_noisy("Introduction to Machine Learning")
         False
     """
-    text_lower = text.lower().strip()
+    stripped = text.strip()
     
-    # Check against known noise words/phrases
-    contains_noise = any(noise_word in text_lower for noise_word in NOISE_WORDS)
+    # Filter out very short text (likely page numbers or artifacts) before
+    # paying for the lowercase copy and the noise search
+    if len(stripped) <= 3:
+        return True
     
-    # Filter out very short text (likely page numbers or artifacts)
-    is_too_short = len(text.strip()) <= 3
+    # Check against known noise words/phrases with a single regex search
+    return _NOISE_RE.search(stripped.lower()) is not None
+
+def extract_page_spans(page, textpage=None):
+    """
+    Walk a page's text once and collect its cleaned, non-noisy spans line by line.
     
-    return contains_noise or is_too_short
+    Parsing a page with get_text("dict") is the most expensive step of the
+    extraction, so each page is walked exactly once and the resulting records
+    are shared by title detection and heading detection. The text layout is
+    read from a MuPDF TextPage, which callers may pass in to reuse it for
+    other extractions of the same page.
+    
+    Args:
+        page: PyMuPDF page object to extract text from
+        textpage: Optional TextPage of the page created with the module's
+                  extraction flags; a new one is built if omitted
+        
+    Returns:
+        list: One (block_y, spans) tuple per text line that has meaningful content,
+              where block_y is the y-coordinate of the line's block and spans is a
+              list of (font_size, cleaned_text) tuples in reading order
+              
+    Examples:
+        >>> extract_page_spans(doc[0])[0]
+        (72.0, [(18.0, "Machine Learning in Healthcare Applications")])
+    """
+    if textpage is None:
+        textpage = page.get_textpage(flags=_TEXT_FLAGS)
+    
+    lines = []
+    
+    # Image blocks are dropped by MuPDF itself, so every block carries text lines
+    for block in page.get_text("dict", textpage=textpage)["blocks"]:
+        block_pos = block["bbox"][1]  # y-coordinate for vertical positioning
+        
+        for line in block["lines"]:
+            spans = []
+            for span in line["spans"]:
+                text = clean_text(span["text"])
+                
+                # Skip noisy or irrelevant text
+                if not is_noisy(text):
+                    spans.append((round(span["size"], 1), text))  # Round to handle floating point precision
+            
+            if spans:
+                lines.append((block_pos, spans))
+    
+    return lines
 
-def extract_title(page):
+def extract_title_from_spans(lines):
     """
-    Extract the main title from the first page of a PDF document.
+    Extract the main title from the span records of the first page of a PDF document.
     
     This function implements a sophisticated title detection algorithm that:
     1. Identifies text with the largest font size on the first page
@@ -106,13 +169,12 @@ def extract_title(page):
     4. Filters out noise and document artifacts
     
     The algorithm works by:
-    - Collecting all text spans grouped by font size
-    - Identifying the maximum font size as the title size
+    - Identifying the maximum font size among meaningful spans as the title size
     - Finding consecutive text blocks with the title size
     - Combining them into a coherent title while preserving word boundaries
     
     Args:
-        page: PyMuPDF page object representing the first page of the document
+        lines (list): Line records of the first page as returned by extract_page_spans
         
     Returns:
         tuple: (title_text, title_font_size)
@@ -120,71 +182,48 @@ def extract_title(page):
             - title_font_size (float): The font size of the title, or None if not found
             
     Examples:
-        >>> page = doc[0]  # First page of a PDF
-        >>> title, size = extract_title(page)
+        >>> title, size = extract_title_from_spans(extract_page_spans(doc[0]))
         >>> print(f"Title: {title}, Size: {size}")
         Title: "Machine Learning in Healthcare Applications", Size: 18.0
     """
-    size_to_texts = defaultdict(list)
-    blocks = page.get_text("dict")["blocks"]
-    
-    # First pass: collect all text spans grouped by their font size
-    for block in blocks:
-        for line in block.get("lines", []):
-            for span in line.get("spans", []):
-                size = round(span["size"], 1)  # Round to handle floating point precision
-                text = clean_text(span["text"])
-                
-                # Filter out noise and very short text fragments
-                if is_noisy(text) or len(text) < 5:
-                    continue
-                    
-                size_to_texts[size].append(text)
+    # Identify the largest font size among meaningful (5+ character) spans
+    max_size = None
+    for _, spans in lines:
+        for size, text in spans:
+            if len(text) >= 5 and (max_size is None or size > max_size):
+                max_size = size
     
     # Return empty result if no valid text found
-    if not size_to_texts:
+    if max_size is None:
         return "", None
     
-    # Identify the largest font size as the potential title size
-    max_size = max(size_to_texts.keys())
-    
-    # Second pass: collect multi-line title by finding consecutive large text blocks
+    # Collect multi-line title by finding consecutive large text blocks
     # This handles cases where titles span multiple lines or text blocks
     title_parts = []
     previous_block_pos = None
     current_title_block = []
     
-    for block in blocks:
-        block_pos = block.get("bbox", (0, 0))[1]  # y-coordinate for vertical positioning
+    for block_pos, spans in lines:
+        # Keep only the text of this line that has the title font size
+        line_texts = [text for size, text in spans if size == max_size]
+        if not line_texts:
+            continue
         
-        for line in block.get("lines", []):
-            line_texts = []
-            line_has_title = False
-            
-            # Check if this line contains text with the title font size
-            for span in line.get("spans", []):
-                if round(span["size"], 1) == max_size:
-                    text = clean_text(span["text"])
-                    if not is_noisy(text):
-                        line_has_title = True
-                        line_texts.append(text)
+        full_line_text = " ".join(line_texts)
+        
+        # Check if this line is a continuation of the previous title line
+        # Lines are considered continuous if they're close vertically (within 20 units)
+        if (previous_block_pos is not None and 
+            abs(block_pos - previous_block_pos) < 20 and  
+            len(current_title_block) > 0):
+            current_title_block.append(full_line_text)
+        else:
+            # Start a new title block
+            if current_title_block:
+                title_parts.append(" ".join(current_title_block))
+            current_title_block = [full_line_text]
             
-            if line_has_title:
-                full_line_text = " ".join(line_texts)
-                
-                # Check if this line is a continuation of the previous title line
-                # Lines are considered continuous if they're close vertically (within 20 units)
-                if (previous_block_pos is not None and 
-                    abs(block_pos - previous_block_pos) < 20 and  
-                    len(current_title_block) > 0):
-                    current_title_block.append(full_line_text)
-                else:
-                    # Start a new title block
-                    if current_title_block:
-                        title_parts.append(" ".join(current_title_block))
-                    current_title_block = [full_line_text]
-                    
-                previous_block_pos = block_pos
+        previous_block_pos = block_pos
     
     # Add the final title block if it exists
     if current_title_block:
@@ -194,6 +233,27 @@ def extract_title(page):
     title = " ".join(title_parts)
     return clean_text(title), max_size
 
+def extract_title(page):
+    """
+    Extract the main title from the first page of a PDF document.
+    
+    Convenience wrapper around extract_page_spans and extract_title_from_spans
+    for callers that only need the title of a single page.
+    
+    Args:
+        page: PyMuPDF page object representing the first page of the document
+        
+    Returns:
+        tuple: (title_text, title_font_size) as returned by extract_title_from_spans
+            
+    Examples:
+        >>> page = doc[0]  # First page of a PDF
+        >>> title, size = extract_title(page)
+        >>> print(f"Title: {title}, Size: {size}")
+        Title: "Machine Learning in Healthcare Applications", Size: 18.0
+    """
+    return extract_title_from_spans(extract_page_spans(page))
+
 def group_multiline_headings(heading_candidates):
     """
     Group consecutive text lines with the same font size into multi-line headings.
@@ -215,13 +275,14 @@ def group_multiline_headings(heading_candidates):
                                  representing potential heading text fragments
         
     Returns:
-        list: List of tuples (font_size, combined_text, page_number) where
-              multi-line headings have been properly combined
+        list: List of tuples (font_size, combined_text, page_number, lower_text) where
+              multi-line headings have been properly combined and lower_text is the
+              lowercased combined text, computed once for duplicate detection
               
     Examples:
         >>> candidates = [(16.0, "Introduction to", 1), (16.0, "machine learning", 1)]
         >>> group_multiline_headings(candidates)
-        [(16.0, "Introduction to machine learning", 1)]
+        [(16.0, "Introduction to machine learning", 1, "introduction to machine learning")]
     """
     if not heading_candidates:
         return []
@@ -233,22 +294,27 @@ def group_multiline_headings(heading_candidates):
     for candidate in heading_candidates[1:]:
         size, text, page = candidate
         
+        # Candidate text is cleaned to single spaces, so the boundary words can be
+        # read with partition/rpartition instead of splitting the whole string
+        last_word_len = len(current_group[1].rpartition(' ')[2])
+        first_word_len = len(text.partition(' ')[0])
+        
         # Check if this candidate should be merged with the current group
         should_merge = (
             size == current_group[0] and  # Same font size
             page == current_group[2] and  # Same page
             (
                 text[0].islower() or  # Starts with lowercase (likely continuation)
-                len(current_group[1].split()[-1]) <= 3 or  # Last word in current group is short
-                len(text.split()[0]) <= 3  # First word in new text is short
+                last_word_len <= 3 or  # Last word in current group is short
+                first_word_len <= 3  # First word in new text is short
             )
         )
         
         if should_merge:
             # Determine how to join the text based on word break patterns
             if (current_group[1].endswith('-') or 
-                len(current_group[1].split()[-1]) <= 2 or 
-                len(text.split()[0]) <= 2):
+                last_word_len <= 2 or 
+                first_word_len <= 2):
                 # Join without space for hyphenated words or very short fragments
                 current_group[1] = current_group[1].rstrip('- ') + text
             else:
@@ -256,11 +322,11 @@ def group_multiline_headings(heading_candidates):
                 current_group[1] += " " + text
         else:
             # Save the current group and start a new one
-            grouped.append(tuple(current_group))
+            grouped.append((*current_group, current_group[1].lower()))
             current_group = list(candidate)
     
     # Don't forget to add the final group
-    grouped.append(tuple(current_group))
+    grouped.append((*current_group, current_group[1].lower()))
     return grouped
 
 def detect_heading_level(size, thresholds, title_size):
@@ -308,6 +374,37 @@ def detect_heading_level(size, thresholds, title_size):
     # Font size too small to be considered a heading
     return None
 
+def classify_levels(sizes, thresholds, title_size):
+    """
+    Determine the heading levels for a whole sequence of font sizes at once.
+    
+    Documents use only a handful of distinct font sizes, so each unique size
+    is classified with detect_heading_level exactly once and every element
+    of the sequence is then resolved with a dictionary lookup.
+    
+    Args:
+        sizes (list): Font sizes of the heading candidates, in document order
+        thresholds (dict): Font size thresholds as used by detect_heading_level
+        title_size (float): Font size of the document title to exclude from headings
+        
+    Returns:
+        list: Heading level ("H1", "H2", "H3") or None for each input size
+        
+    Examples:
+        >>> thresholds = {"H1": 16.0, "H2": 14.0, "H3": 12.0}
+        >>> classify_levels([16.0, 20.0, 12.0, 16.0], thresholds, 20.0)
+        ["H1", None, "H3", "H1"]
+    """
+    size_to_level = {}
+    levels = []
+    
+    for size in sizes:
+        if size not in size_to_level:
+            size_to_level[size] = detect_heading_level(size, thresholds, title_size)
+        levels.append(size_to_level[size])
+    
+    return levels
+
 def extract_outline(pdf_path):
     """
     Extract the complete document outline (title and hierarchical headings) from a PDF file.
@@ -348,11 +445,14 @@ def extract_outline(pdf_path):
         >>> print(result["outline"][0])
         {"level": "H1", "text": "Introduction", "page": 1}
     """
-    # Open the PDF document using PyMuPDF
-    doc = fitz.open(pdf_path)
+    # Open the PDF document using PyMuPDF; the context manager releases the file
+    # and MuPDF's document resources as soon as parsing ends, even on errors
+    with fitz.open(pdf_path) as doc:
+        # Parse every page exactly once; the records feed both title and heading detection
+        page_spans = [extract_page_spans(page) for page in doc]
     
     # Extract title from the first page
-    title, title_size = extract_title(doc[0])
+    title, title_size = extract_title_from_spans(page_spans[0])
     
     # Fallback to filename if no title is detected
     if not title:
@@ -361,33 +461,31 @@ def extract_outline(pdf_path):
     # Collect potential heading candidates from all pages
     heading_candidates = []
 
-    for page_num, page in enumerate(doc, start=1):
-        blocks = page.get_text("dict")["blocks"]
-        
-        # Process each text block on the page
-        for block in blocks:
-            for line in block.get("lines", []):
-                line_text = []
-                max_size_in_line = 0
+    for page_num, lines in enumerate(page_spans, start=1):
+        # Process each text line on the page
+        for _, spans in lines:
+            cleaned = []
+            max_size_in_line = 0
+            needs_clean = False
+            
+            # Collect text and find the maximum font size in this line
+            for size, text in spans:
+                # Track the largest font size in this line
+                if size > max_size_in_line:
+                    max_size_in_line = size
+                cleaned.append(text)
                 
-                # Collect text and find the maximum font size in this line
-                for span in line.get("spans", []):
-                    text = clean_text(span["text"])
-                    size = round(span["size"], 1)
-                    
-                    # Skip noisy or irrelevant text
-                    if is_noisy(text):
-                        continue
-                    
-                    # Track the largest font size in this line
-                    if size > max_size_in_line:
-                        max_size_in_line = size
-                    line_text.append(text)
-
-                # Combine all text in the line and add as heading candidate
-                full_line_text = clean_text(" ".join(line_text))
-                if full_line_text and len(full_line_text) > 3 and not is_noisy(full_line_text):
-                    heading_candidates.append((max_size_in_line, full_line_text, page_num))
+                # Spans are already cleaned, so joining them only needs another
+                # pass when a hyphenated word break may be left to repair
+                if text.endswith("-") or "- " in text:
+                    needs_clean = True
+
+            # Combine all text in the line and add as heading candidate
+            full_line_text = " ".join(cleaned)
+            if needs_clean:
+                full_line_text = clean_text(full_line_text)
+            if full_line_text and len(full_line_text) > 3 and not is_noisy(full_line_text):
+                heading_candidates.append((max_size_in_line, full_line_text, page_num))
 
     # Group multi-line headings and fix word breaks
     heading_candidates = group_multiline_headings(heading_candidates)
@@ -397,7 +495,7 @@ def extract_outline(pdf_path):
         return {"title": title, "outline": []}
 
     # Analyze font sizes to establish heading level thresholds
-    heading_sizes = [size for size, _, _ in heading_candidates if size != title_size]
+    heading_sizes = [size for size, _, _, _ in heading_candidates if size != title_size]
     if not heading_sizes:
         return {"title": title, "outline": []}
     
@@ -410,20 +508,21 @@ def extract_outline(pdf_path):
         "H2": unique_sizes[1] if len(unique_sizes) > 1 else unique_sizes[0] * 0.85,
         "H3": unique_sizes[2] if len(unique_sizes) > 2 else unique_sizes[-1] * 0.7,
     }
+    
+    # Assign a level to every candidate in one batch
+    levels = classify_levels([size for size, _, _, _ in heading_candidates], thresholds, title_size)
 
-    # Process heading candidates and assign levels
+    # Process heading candidates and build the outline
     outline = []
     seen = set()  # Track processed headings to avoid duplicates
     
-    for size, text, page in heading_candidates:
+    for (size, text, page, lower_text), level in zip(heading_candidates, levels):
         # Create a unique key to detect duplicates
-        key = (text.lower(), page)
+        key = (lower_text, page)
         if key in seen:
             continue
         seen.add(key)
 
-        # Determine the heading level based on font size
-        level = detect_heading_level(size, thresholds, title_size)
         if level:
             outline.append({
                 "level": level,
@@ -439,8 +538,8 @@ if __name__ == "__main__":
     
     This script processes all PDF files in the 'input' directory and generates
     corresponding JSON outline files in the 'output' directory. Each PDF is
-    processed independently, and the results are saved with the same filename
-    but with a .json extension.
+    processed independently in a pool of up to four worker processes, and the
+    results are saved with the same filename but with a .json extension.
     
     Directory structure expected:
     - input/: Contains PDF files to process
@@ -458,20 +557,29 @@ if __name__ == "__main__":
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
 
-    # Process each PDF file in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".pdf"):
-            # Construct file paths
-            in_path = os.path.join(input_dir, filename)
+    # Collect the PDF files in the input directory
+    filenames = [filename for filename in os.listdir(input_dir) if filename.endswith(".pdf")]
+
+    # PDFs are independent and CPU-bound, so extract them in parallel worker processes
+    with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, 4)) as executor:
+        futures = [
+            executor.submit(extract_outline, os.path.join(input_dir, filename))
+            for filename in filenames
+        ]
+
+        # Save results in input order as each extraction completes
+        for filename, future in zip(filenames, futures):
             out_path = os.path.join(output_dir, filename.replace(".pdf", ".json"))
             
             try:
-                # Extract outline from PDF
-                result = extract_outline(in_path)
+                # Wait for the outline extracted by the worker process
+                result = future.result()
 
-                # Save results to JSON file with proper formatting
+                # Serialize the outline up front and save it with a single write;
+                # json.dump would issue one small write per encoded fragment
+                output = json.dumps(result, indent=2, ensure_ascii=False)
                 with open(out_path, "w", encoding="utf-8") as f:
-                    json.dump(result, f, indent=2, ensure_ascii=False)
+                    f.write(output)
 
                 # Report successful processing
                 print(f"Successfully processed {filename} -> {os.path.basename(out_path)}")
@@ -19,8 +19,8 @@ def detect_headings(elements):
     Detect and classify headings from a list of text elements using font size analysis.
     
     This function implements a font-size-based heading detection algorithm that:
-    1. Sorts all text elements by font size in descending order
-    2. Identifies unique font sizes and maps them to heading levels
+    1. Scans the text elements once for the four largest unique font sizes
+    2. Maps those font sizes to heading levels in descending order
     3. Classifies the largest font as title, and subsequent sizes as H1, H2, H3
     4. Groups headings by their classification level
     
@@ -66,23 +66,24 @@ def detect_headings(elements):
         - Multiple headings of the same level are collected in lists
         - Empty input returns an outline with None title and empty heading lists
     """
-    # Sort elements by font size in descending order to establish hierarchy
-    sorted_elements = sorted(elements, key=lambda x: -x["size"])
-    
-    # Extract all font sizes and get unique values in descending order
-    sizes = [el["size"] for el in sorted_elements]
-    unique_sizes = sorted(set(sizes), reverse=True)
+    # Find the four largest unique font sizes in a single pass, keeping them in
+    # descending order; a full sort of all elements is not needed for this
+    top_sizes = []
+    for el in elements:
+        size = el["size"]
+        if size in top_sizes:
+            continue
+        if len(top_sizes) < 4 or size > top_sizes[-1]:
+            for i, existing in enumerate(top_sizes):
+                if size > existing:
+                    top_sizes.insert(i, size)
+                    break
+            else:
+                top_sizes.append(size)
+            del top_sizes[4:]
 
     # Map font sizes to heading levels based on hierarchy
-    size_to_level = {}
-    if unique_sizes:
-        size_to_level[unique_sizes[0]] = "title"
-        if len(unique_sizes) > 1:
-            size_to_level[unique_sizes[1]] = "h1"
-        if len(unique_sizes) > 2:
-            size_to_level[unique_sizes[2]] = "h2"
-        if len(unique_sizes) > 3:
-            size_to_level[unique_sizes[3]] = "h3"
+    size_to_level = dict(zip(top_sizes, ("title", "h1", "h2", "h3")))
 
     # Initialize the outline structure
     outline = {
@@ -15,6 +15,11 @@ Date: 2025
 
 import fitz  # PyMuPDF library for PDF processing
 
+# Default "dict" extraction flags without image blocks, which are never used here.
+# Without them MuPDF also stops splitting text lines at inline images, so text on
+# either side of an image is extracted as one line
+_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
 
 def extract_pdf_elements(pdf_path):
     """
@@ -58,35 +63,31 @@ def extract_pdf_elements(pdf_path):
         - Text is stripped of leading/trailing whitespace
         - Page numbers start from 1 (not 0)
     """
-    # Open the PDF document
-    doc = fitz.open(pdf_path)
     elements = []
 
-    # Process each page in the document
-    for page_number, page in enumerate(doc, start=1):
-        # Get text content structured as blocks, lines, and spans
-        blocks = page.get_text("dict")["blocks"]
-        
-        for block in blocks:
-            # Skip blocks that don't contain text lines (e.g., images)
-            if "lines" not in block:
-                continue
-                
-            # Process each line in the text block
-            for line in block["lines"]:
-                # Process each text span in the line
-                for span in line["spans"]:
-                    text = span["text"].strip()
-                    
-                    # Only include non-empty text spans
-                    if text:
-                        elements.append({
-                            "text": text,
-                            "size": span["size"],
-                            "font": span["font"],
-                            "page": page_number
-                        })
+    # Open the PDF document; the context manager closes it to free memory,
+    # also when extraction fails part-way through
+    with fitz.open(pdf_path) as doc:
+        # Process each page in the document
+        for page_number, page in enumerate(doc, start=1):
+            # Get text content structured as blocks, lines, and spans; image blocks
+            # are left out by the extraction flags, so every block has text lines
+            blocks = page.get_text("dict", flags=_TEXT_FLAGS)["blocks"]
+            
+            for block in blocks:
+                # Process each line in the text block
+                for line in block["lines"]:
+                    # Process each text span in the line
+                    for span in line["spans"]:
+                        text = span["text"].strip()
+                        
+                        # Only include non-empty text spans
+                        if text:
+                            elements.append({
+                                "text": text,
+                                "size": span["size"],
+                                "font": span["font"],
+                                "page": page_number
+                            })
     
-    # Close the document to free memory
-    doc.close()
     return elements